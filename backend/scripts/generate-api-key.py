@@ -1,21 +1,31 @@
 #!/usr/bin/env python3
 """
 Generate a development API key for the Terraform Registry backend
+
+Keys from this script are for local development only, so the bcrypt cost
+defaults to the minimum (4) to keep it fast. Production keys are created by
+the server itself using auth.BcryptCost. Pass --rounds to match production.
 """
+import argparse
 import secrets
-import base64
 import bcrypt
 
+parser = argparse.ArgumentParser(description="Generate a development API key.")
+parser.add_argument("--rounds", type=int, default=4,
+                    help="bcrypt cost factor, 4-31 (default: 4, dev only)")
+args = parser.parse_args()
+if not 4 <= args.rounds <= 31:
+    parser.error("--rounds must be between 4 and 31")
+
 # Generate a 32-byte random key
-random_bytes = secrets.token_bytes(32)
-random_part = base64.urlsafe_b64encode(random_bytes).decode('ascii').rstrip('=')
+random_part = secrets.token_urlsafe(32)
 
 # Create full key with prefix
 prefix = "dev"
 full_key = f"{prefix}_{random_part}"
 
 # Hash the key with bcrypt
-key_hash = bcrypt.hashpw(full_key.encode('utf-8'), bcrypt.gensalt(rounds=10)).decode('utf-8')
+key_hash = bcrypt.hashpw(full_key.encode('utf-8'), bcrypt.gensalt(rounds=args.rounds)).decode('utf-8')
 
 # Display prefix (first 10 chars)
 display_prefix = full_key[:10]
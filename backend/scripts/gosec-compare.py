@@ -7,48 +7,98 @@ Usage:
         --results  gosec-results.json \\
         --baseline gosec-baseline.json \\
         --base-dir /path/to/backend \\
-        --output   /tmp/issue-body.md   # optional; written when new findings exist
+        --output   /tmp/issue-body.md \\   # optional; written when new findings exist
+        --no-sort \\                     # optional; skip ordering findings by rule/file/line
+        --quiet-resolved \\              # optional; count resolved findings without listing them
+        --changed-files changed.txt \\   # optional; only compare findings in these files
+        --changed-files-root ..         # optional; directory the changed paths are relative to
+                                        #   (default: `git rev-parse --show-toplevel`, so
+                                        #   `git diff --name-only base...head` output works as-is)
 
 Exit codes:
     0  No new unsuppressed findings.
     1  One or more new findings detected (CI should create a GitHub issue).
+
+Optional dependencies (used when installed, stdlib fallback otherwise):
+    ijson   Stream the Issues array instead of loading the whole report.
+    orjson  Faster whole-document parsing when ijson is not installed.
 """
 
 import argparse
-import json
+import functools
+import hashlib
+import io
 import os
+import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 
+try:
+    # Optional: stream large reports issue-by-issue instead of loading them whole.
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    # Optional: faster drop-in for json.loads when the whole report is loaded.
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
 
+@functools.lru_cache(maxsize=None)
 def _anchor(code: str) -> str:
     """Return the first two meaningful code lines, with gosec line-number prefixes stripped."""
+    # Walk the snippet with str.find rather than splitlines(): we only need two
+    # lines, and gosec snippets often carry many more lines of context.
     stripped = []
-    for raw in code.splitlines():
-        s = raw.strip()
-        if not s:
-            continue
-        # gosec format: "123: actual code"
-        if ": " in s:
-            s = s.split(": ", 1)[1].strip()
-        stripped.append(s)
-        if len(stripped) == 2:
+    start = 0
+    while len(stripped) < 2:
+        nl = code.find("\n", start)
+        s = code[start:nl if nl >= 0 else None].strip()
+        if s:
+            # gosec format: "123: actual code"
+            if ": " in s:
+                s = s.split(": ", 1)[1].strip()
+            stripped.append(s)
+        if nl < 0:
             break
+        start = nl + 1
     return " | ".join(stripped)
 
 
 # Top-level directories that immediately follow the module root in any path layout.
 # Used to strip OS-specific absolute prefixes for cross-platform fingerprinting.
+# Order matters: markers are tried in turn, so "/internal/" wins over a "test" or
+# "docs" directory that happens to sit above the checkout.
 _MODULE_ROOT_MARKERS = (
     "/internal/", "/cmd/", "/pkg/", "/scripts/",
     "/api/", "/docs/", "/test/", "/vendor/",
 )
 
 
-def _normalize_path(raw_file: str, base_dir: Path) -> str:
+@dataclass(frozen=True, slots=True)
+class PathCtx:
+    """Per-run path normalisation settings, built once in main."""
+
+    base_fwd: str  # base_dir with forward slashes and a trailing "/"
+    markers: tuple[str, ...] = _MODULE_ROOT_MARKERS
+
+    @classmethod
+    def from_base_dir(cls, base_dir: Path) -> "PathCtx":
+        return cls(base_fwd=str(base_dir).replace("\\", "/").rstrip("/") + "/")
+
+
+@functools.lru_cache(maxsize=None)
+def _normalize_path(raw_file: str, ctx: PathCtx) -> str:
     """
     Return a portable, platform-independent relative path.
 
+    Memoised: many findings share a file, and every path is normalised at least
+    twice (fingerprinting and reporting).
+
     Handles three situations:
     - Path is already relative (CI, Linux)
     - Path is absolute on the same OS (local dev, same platform)
@@ -56,15 +106,14 @@ def _normalize_path(raw_file: str, base_dir: Path) -> str:
     """
     # Normalise to forward slashes first.
     norm = raw_file.replace("\\", "/")
-    base_fwd = str(base_dir).replace("\\", "/").rstrip("/") + "/"
 
     # Happy-path: base_dir prefix matches.
-    if norm.startswith(base_fwd):
-        return norm[len(base_fwd):]
+    if norm.startswith(ctx.base_fwd):
+        return norm[len(ctx.base_fwd):]
 
     # Cross-platform fallback: find the first known module-root marker.
     # e.g. "C:/dev/…/backend/internal/foo/bar.go" → "internal/foo/bar.go"
-    for marker in _MODULE_ROOT_MARKERS:
+    for marker in ctx.markers:
         idx = norm.find(marker)
         if idx >= 0:
             return norm[idx + 1:]  # drop the leading "/"
@@ -73,43 +122,183 @@ def _normalize_path(raw_file: str, base_dir: Path) -> str:
     return norm
 
 
-def fingerprint(issue: dict, base_dir: Path) -> str:
+# (rule_id, relative_file, details, anchor) — hashed and compared per field, so no
+# key string is built and no field can collide with a delimiter.
+Fingerprint = tuple[str, str, str, str]
+
+
+def fingerprint(issue: dict, ctx: PathCtx) -> Fingerprint:
     """
     Stable fingerprint that survives line-number drift *and* OS path differences.
     Key: rule_id + relative_file + details_string + first-two-code-lines-content
     """
     rule = issue.get("rule_id", "")
-    rel = _normalize_path(issue.get("file", ""), base_dir)
+    rel = _normalize_path(issue.get("file", ""), ctx)
     details = issue.get("details", "")
     anchor = _anchor(issue.get("code", ""))
-    return f"{rule}:{rel}:{details}:{anchor}"
+    return (rule, rel, details, anchor)
+
+
+# Low-cardinality fields (a few dozen rule IDs, three severities/confidences)
+# repeated on every issue; interning shares one string object per value.
+_INTERNED_FIELDS = ("rule_id", "severity", "confidence")
 
 
-def load_findings(path: str, base_dir: Path) -> tuple[dict, dict]:
-    """Return (fingerprint→issue dict of unsuppressed findings, stats dict)."""
+def load_findings(
+    path: str, ctx: PathCtx, changed: frozenset[str] | None = None
+) -> tuple[dict, dict]:
+    """
+    Return (fingerprint→issue dict of unsuppressed findings, stats dict).
+
+    When changed is given, findings in files outside that set are skipped
+    before fingerprinting.
+
+    With ijson installed, issues are streamed one at a time so peak memory is
+    bounded by a single issue rather than the whole report; otherwise the
+    report is parsed in one go with orjson (or the stdlib json module).
+    """
+    fps: dict[Fingerprint, dict] = {}
+    with open(path, "rb") as fh:
+        if ijson is not None:
+            issues = ijson.items(fh, "Issues.item")
+            stats = None
+        else:
+            data = _loads(fh.read())
+            issues = data.get("Issues") or []
+            stats = data.get("Stats", {})
+
+        for issue in issues:
+            if issue.get("nosec", False):
+                continue
+            if changed is not None and _rel(issue, ctx) not in changed:
+                continue
+            for key in _INTERNED_FIELDS:
+                value = issue.get(key)
+                if isinstance(value, str):
+                    issue[key] = sys.intern(value)
+            # gosec can report one logical finding several times (e.g. across build
+            # tags). setdefault keeps the first and skips re-inserting duplicates
+            # with a single hash lookup.
+            fps.setdefault(fingerprint(issue, ctx), issue)
+
+        if stats is None:
+            # gosec writes Stats after Issues, so re-scan for it in a second pass.
+            stats = _read_stats(fh)
+    return fps, stats
+
+
+# Above this many changed files the filter saves little; fall back to a full compare.
+_CHANGED_FILES_LIMIT = 500
+
+
+def _git_toplevel(cwd: Path) -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--show-toplevel"],
+            cwd=cwd, capture_output=True, text=True, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def _read_changed_files(path: str, root: Path, ctx: PathCtx) -> frozenset[str] | None:
+    """
+    Return the paths listed in path (one per line, relative to root, e.g. the
+    output of `git diff --name-only`) as base_dir-relative paths, or None when
+    the list is too long to be worth filtering.
+
+    Each entry is joined onto root and must then sit under base_dir; the
+    marker fallback in _normalize_path is deliberately not used here, since a
+    mis-normalised entry would silently drop findings. Entries outside base_dir
+    cannot carry findings and are ignored.
+    """
+    changed = set()
     with open(path, encoding="utf-8") as fh:
-        data = json.load(fh)
-    issues = data.get("Issues") or []
-    active = [i for i in issues if not i.get("nosec", False)]
-    fps: dict[str, dict] = {}
-    for issue in active:
-        fp = fingerprint(issue, base_dir)
-        fps[fp] = issue
-    return fps, data.get("Stats", {})
+        for ln in fh:
+            ln = ln.strip()
+            if not ln:
+                continue
+            full = os.path.normpath(os.path.join(root, ln)).replace("\\", "/")
+            if full.startswith(ctx.base_fwd):
+                changed.add(full[len(ctx.base_fwd):])
+    if len(changed) > _CHANGED_FILES_LIMIT:
+        print(f"{len(changed)} changed files (> {_CHANGED_FILES_LIMIT}); comparing all findings.")
+        return None
+    return frozenset(changed)
+
+
+def _read_stats(fh) -> dict:
+    """Return the Stats block of an open (binary) gosec report."""
+    fh.seek(0)
+    if ijson is not None:
+        return next(ijson.items(fh, "Stats"), {})
+    return _loads(fh.read()).get("Stats", {})
+
+
+def _file_digest(path: str) -> bytes:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while chunk := fh.read(1 << 20):
+            h.update(chunk)
+    return h.digest()
+
 
+def _identical(a: str, b: str) -> bool:
+    """True when both reports have byte-identical content (cheap size check first)."""
+    if os.path.getsize(a) != os.path.getsize(b):
+        return False
+    return _file_digest(a) == _file_digest(b)
 
-def _rel(issue: dict, base_dir: Path) -> str:
-    return _normalize_path(issue.get("file", "?"), base_dir)
 
+def _rel(issue: dict, ctx: PathCtx) -> str:
+    return _normalize_path(issue.get("file", "?"), ctx)
+
+
+def _report_order(issue: dict, ctx: PathCtx) -> tuple[str, str, int]:
+    """Sort key for printed findings: rule, then file, then line."""
+    # gosec reports "line" as a string, sometimes a range such as "12-14".
+    line = str(issue.get("line", "")).split("-", 1)[0]
+    return issue.get("rule_id", ""), _rel(issue, ctx), int(line) if line.isdigit() else 0
+
+
+def _ordered(issues, ctx: PathCtx, sort: bool) -> list[dict]:
+    if not sort:
+        return list(issues)
+    return sorted(issues, key=lambda i: _report_order(i, ctx))
+
+
+# Report fields read for every new finding, with their placeholder when absent.
+_ISSUE_FIELD_DEFAULTS = (
+    ("rule_id", "?"), ("severity", "?"), ("confidence", "?"),
+    ("details", "?"), ("line", "?"), ("code", ""),
+)
+
+# Shared stand-in for a missing "cwe" block; never mutated.
+_EMPTY: dict = {}
+
+
+def build_issue_body(
+    new_issues: list[dict], resolved_count: int, ctx: PathCtx, out=None
+) -> str | None:
+    """
+    Render the GitHub issue markdown for new findings.
+
+    When out (a text file handle) is given, each section is written to it as it
+    is rendered and None is returned; otherwise the body is returned as a string.
+    """
+    if out is None:
+        buf = io.StringIO()
+        build_issue_body(new_issues, resolved_count, ctx, buf)
+        return buf.getvalue()
 
-def build_issue_body(new_issues: list[dict], resolved_count: int, base_dir: Path) -> str:
     ref = os.environ.get("GITHUB_REF_NAME", "<branch>")
     sha = os.environ.get("GITHUB_SHA", "<sha>")
     server = os.environ.get("GITHUB_SERVER_URL", "https://github.com")
     repo = os.environ.get("GITHUB_REPOSITORY", "<owner/repo>")
     run_id = os.environ.get("GITHUB_RUN_ID", "<run>")
 
-    lines = [
+    header = [
         "## \U0001f6a8 New gosec Security Findings",
         "",
         f"The security scan found **{len(new_issues)} new finding(s)** not present in the committed baseline.",
@@ -124,19 +313,21 @@ def build_issue_body(new_issues: list[dict], resolved_count: int, base_dir: Path
         "### New Findings",
         "",
     ]
+    # Sections after the header start with "" so that the leading "\n" separates
+    # them from the previous one, matching a single "\n".join over all lines.
+    out.write("\n".join(header))
 
     for issue in new_issues:
-        rule = issue.get("rule_id", "?")
-        severity = issue.get("severity", "?")
-        confidence = issue.get("confidence", "?")
-        details = issue.get("details", "?")
-        line = issue.get("line", "?")
-        code = issue.get("code", "").strip()
-        cwe = issue.get("cwe") or {}
+        rule, severity, confidence, details, line, code = (
+            issue.get(k, d) for k, d in _ISSUE_FIELD_DEFAULTS
+        )
+        code = code.strip()
+        cwe = issue.get("cwe") or _EMPTY
         cwe_str = f" — [CWE-{cwe['id']}]({cwe['url']})" if cwe else ""
-        rel = _rel(issue, base_dir)
+        rel = _rel(issue, ctx)
 
-        lines += [
+        out.write("\n".join((
+            "",
             f"#### `{rule}` · {severity}/{confidence} — {details}{cwe_str}",
             f"**File:** `{rel}` line {line}",
             "```go",
@@ -146,14 +337,21 @@ def build_issue_body(new_issues: list[dict], resolved_count: int, base_dir: Path
             f"> If this is a false positive, add `// #nosec {rule} -- <reason>` to the flagged line, "
             f"then regenerate the baseline with `bash scripts/update-gosec-baseline.sh` and commit both.",
             "",
-        ]
+        )))
 
-    lines += [
+    out.write("\n".join((
+        "",
         "---",
         "_Auto-created by the [`gosec` CI job](/.github/workflows/ci.yml). "
         "Close once all findings are fixed, suppressed, or added to the baseline with justification._",
-    ]
-    return "\n".join(lines)
+    )))
+    return None
+
+
+def _print_stats(stats: dict) -> None:
+    print(f"Files scanned  : {stats.get('files', '?')}")
+    print(f"Lines scanned  : {stats.get('lines', '?')}")
+    print(f"nosec suppressed: {stats.get('nosec', '?')}")
 
 
 def main() -> None:
@@ -162,46 +360,90 @@ def main() -> None:
     parser.add_argument("--baseline", required=True, help="Path to committed baseline JSON")
     parser.add_argument("--base-dir", default=".",    help="Repo base dir for relative paths")
     parser.add_argument("--output",   default=None,   help="Write issue body markdown to this file")
+    parser.add_argument("--no-sort",  action="store_true",
+                        help="Report findings in arbitrary order (faster when only the exit code matters)")
+    parser.add_argument("--quiet-resolved", action="store_true",
+                        help="Only count resolved findings; do not list them")
+    parser.add_argument("--changed-files", default=None,
+                        help="File listing changed paths, one per line; only findings in those files are compared")
+    parser.add_argument("--changed-files-root", default=None,
+                        help="Directory the --changed-files paths are relative to (default: git top-level)")
     args = parser.parse_args()
 
     base_dir = Path(args.base_dir).resolve()
+    if args.changed_files:
+        root = args.changed_files_root or _git_toplevel(base_dir)
+        if root is None:
+            parser.error("--changed-files-root is required outside a git checkout")
+        changed_root = Path(root).resolve()
+
+    # Common CI case: the baseline was just regenerated from this very scan.
+    # Skip parsing and fingerprinting entirely when the files match byte-for-byte.
+    if _identical(args.results, args.baseline):
+        with open(args.results, "rb") as fh:
+            _print_stats(_read_stats(fh))
+        print("Results are identical to the baseline.")
+        print("\n\u2705 No new security findings — scan clean.")
+        sys.exit(0)
 
-    current,  stats_cur  = load_findings(args.results,  base_dir)
-    baseline, stats_base = load_findings(args.baseline, base_dir)
+    ctx = PathCtx.from_base_dir(base_dir)
+    changed = _read_changed_files(args.changed_files, changed_root, ctx) if args.changed_files else None
 
-    new_fps      = set(current) - set(baseline)
-    resolved_fps = set(baseline) - set(current)
+    # The two reports are independent: load them side by side. Each call owns its
+    # file handle and result dict; the shared lru_caches are thread-safe.
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        f_cur  = ex.submit(load_findings, args.results,  ctx, changed)
+        f_base = ex.submit(load_findings, args.baseline, ctx)
+        current,  stats_cur  = f_cur.result()
+        baseline, stats_base = f_base.result()
 
-    new_issues      = [current[fp]  for fp in sorted(new_fps)]
-    resolved_issues = [baseline[fp] for fp in sorted(resolved_fps)]
+    new_fps      = current.keys() - baseline.keys()
+    resolved_fps = baseline.keys() - current.keys()
+    if changed is not None:
+        # Baseline findings in untouched files were not rescanned, so they are not resolved.
+        resolved_fps = {fp for fp in resolved_fps if fp[1] in changed}
+
+    sort = not args.no_sort
+    new_issues     = _ordered((current[fp] for fp in new_fps), ctx, sort)
+    resolved_count = len(resolved_fps)
 
     # ── Summary ────────────────────────────────────────────────────────────────
-    print(f"Files scanned  : {stats_cur.get('files', '?')}")
-    print(f"Lines scanned  : {stats_cur.get('lines', '?')}")
-    print(f"nosec suppressed: {stats_cur.get('nosec', '?')}")
-    print(f"Active findings: {len(current)}  (baseline: {len(baseline)})")
+    _print_stats(stats_cur)
+    scope = f"  [{len(changed)} changed file(s) only]" if changed is not None else ""
+    print(f"Active findings: {len(current)}  (baseline: {len(baseline)}){scope}")
     print(f"New            : {len(new_issues)}")
-    print(f"Resolved       : {len(resolved_issues)}")
+    print(f"Resolved       : {resolved_count}")
 
-    if resolved_issues:
-        print("\n\u2705 Resolved (in baseline but no longer present — consider pruning baseline):")
-        for i in resolved_issues:
-            print(f"  [{i['rule_id']}] {_rel(i, base_dir)}:{i.get('line','?')} — {i.get('details','')}")
+    # Only look up and order the resolved issues when they are going to be listed.
+    if resolved_count and not args.quiet_resolved:
+        out = ["\n\u2705 Resolved (in baseline but no longer present — consider pruning baseline):\n"]
+        out.extend(
+            f"  [{i['rule_id']}] {_rel(i, ctx)}:{i.get('line','?')} — {i.get('details','')}\n"
+            for i in _ordered((baseline[fp] for fp in resolved_fps), ctx, sort)
+        )
+        sys.stdout.write("".join(out))
 
     if not new_issues:
         print("\n\u2705 No new security findings — scan clean.")
         sys.exit(0)
 
     # ── New findings ───────────────────────────────────────────────────────────
-    print("\n\U0001f6a8 NEW findings not in baseline:")
-    for i in new_issues:
-        print(f"  [{i['rule_id']}] {i.get('severity','?')}/{i.get('confidence','?')} "
-              f"{_rel(i, base_dir)}:{i.get('line','?')} — {i.get('details','')}")
-
-    body = build_issue_body(new_issues, len(resolved_issues), base_dir)
+    # One write per block rather than a print() per finding.
+    out = ["\n\U0001f6a8 NEW findings not in baseline:\n"]
+    out.extend(
+        f"  [{i['rule_id']}] {i.get('severity','?')}/{i.get('confidence','?')} "
+        f"{_rel(i, ctx)}:{i.get('line','?')} — {i.get('details','')}\n"
+        for i in new_issues
+    )
+    sys.stdout.write("".join(out))
 
     if args.output:
-        Path(args.output).write_text(body, encoding="utf-8")
+        # Stream the body straight to disk rather than building it in memory first.
+        # Rendering to a string and issuing one os.write() on a raw fd would skip
+        # the TextIOWrapper, but only pays off for tiny bodies and needs the whole
+        # body in memory; the buffered file already batches these writes.
+        with open(args.output, "w", encoding="utf-8") as fh:
+            build_issue_body(new_issues, resolved_count, ctx, fh)
         print(f"\nIssue body written to: {args.output}")
 
     sys.exit(1)
@@ -0,0 +1,90 @@
+"""
+Regression tests for gosec-compare.py.
+
+Run from backend/:
+    python3 -m unittest discover -s scripts -p "test_*.py"
+"""
+
+import importlib.util
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+_SPEC = importlib.util.spec_from_file_location(
+    "gosec_compare", Path(__file__).with_name("gosec-compare.py")
+)
+gc = importlib.util.module_from_spec(_SPEC)
+_SPEC.loader.exec_module(gc)
+
+
+class NormalizePathTest(unittest.TestCase):
+    def setUp(self):
+        self.ctx = gc.PathCtx.from_base_dir(Path("/ci/work/trb/backend"))
+
+    def test_base_dir_prefix(self):
+        self.assertEqual(
+            gc._normalize_path("/ci/work/trb/backend/internal/api/x.go", self.ctx),
+            "internal/api/x.go",
+        )
+
+    def test_windows_path(self):
+        self.assertEqual(
+            gc._normalize_path("C:\\dev\\trb\\backend\\internal\\foo\\bar.go", self.ctx),
+            "internal/foo/bar.go",
+        )
+
+    def test_marker_name_in_foreign_prefix(self):
+        # A baseline written from a checkout under e.g. ~/test/ must still
+        # normalise to the module-relative path, not from the first marker seen.
+        for prefix in ("/home/dev/test/trb", "/srv/docs/trb", "/opt/api/pkg/trb"):
+            with self.subTest(prefix=prefix):
+                self.assertEqual(
+                    gc._normalize_path(f"{prefix}/backend/internal/mirror/upstream.go", self.ctx),
+                    "internal/mirror/upstream.go",
+                )
+
+
+class ChangedFilesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.repo = Path(self.tmp.name).resolve()
+        self.ctx = gc.PathCtx.from_base_dir(self.repo / "backend")
+
+    def _changed(self, lines, root):
+        listing = self.repo / "changed.txt"
+        listing.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return gc._read_changed_files(str(listing), root, self.ctx)
+
+    def test_repo_root_relative(self):
+        # `git diff --name-only` output: relative to the repository root.
+        changed = self._changed(
+            ["backend/internal/api/handlers/x.go", "backend/main.go", "README.md"], self.repo
+        )
+        self.assertEqual(changed, {"internal/api/handlers/x.go", "main.go"})
+
+    def test_base_dir_relative(self):
+        changed = self._changed(
+            ["internal/api/handlers/x.go", "main.go"], self.repo / "backend"
+        )
+        self.assertEqual(changed, {"internal/api/handlers/x.go", "main.go"})
+
+    def test_filter_keeps_findings_in_changed_files(self):
+        base = self.ctx.base_fwd
+        issues = [
+            {"rule_id": "G101", "file": f"{base}internal/api/handlers/x.go", "details": "a", "code": "1: a"},
+            {"rule_id": "G101", "file": f"{base}internal/api/handlers/x.go", "details": "b", "code": "2: b"},
+            {"rule_id": "G101", "file": f"{base}main.go", "details": "c", "code": "3: c"},
+            {"rule_id": "G101", "file": f"{base}internal/other.go", "details": "d", "code": "4: d"},
+        ]
+        report = self.repo / "results.json"
+        report.write_text(json.dumps({"Issues": issues, "Stats": {}}), encoding="utf-8")
+        changed = self._changed(["backend/internal/api/handlers/x.go", "backend/main.go"], self.repo)
+
+        fps, _ = gc.load_findings(str(report), self.ctx, changed)
+        self.assertEqual(sorted(fp[2] for fp in fps), ["a", "b", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()